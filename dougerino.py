@@ -10,19 +10,22 @@ import datetime
 import functools
 import gzip
 import hashlib
+import heapq
+import itertools
 import json
+import math
 import os
 import platform
 import shutil
 import socket
 import sys
+import tempfile
+import threading
 import time
 from fnmatch import fnmatch
 from pprint import pprint
 from timeit import default_timer
 
-import pkg_resources
-
 # logcalls() appears first in this file, so that it can be used to decorate
 # other functions below
 def logcalls(options="args/return/timer"):
@@ -218,6 +221,269 @@ def csv_count(csvfile, column):
     return unique_values
 
 
+def csv_join(
+    leftfile,
+    rightfile,
+    outfile,
+    on,
+    columns=None,
+    how="inner",
+    lower=True,
+    max_memory=256 * 1024 * 1024,
+    max_open=None,
+):
+    """Join two CSV files on a key column, and write the result to a CSV file.
+
+    leftfile = left CSV file; must have a header row
+    rightfile = right CSV file; must have a header row
+    outfile = name of CSV file to be written
+    on = name of the key column, or a (leftname, rightname) tuple if the key
+         column has different names in the two files
+    columns = list of column names to be written to outfile, in order; each
+              name is looked up in leftfile's header first, then rightfile's.
+              Prefix a name with 'left.' or 'right.' to specify which file it
+              comes from; e.g., 'right.name' if both files have a name column.
+              Default = all left columns, then all right columns except the key
+    how = 'inner' (only rows with a match in both files) or 'left' (all rows
+          from leftfile, with blank right columns if there is no match)
+    lower = whether to ignore case when matching keys
+    max_memory = approximate # bytes to use for the in-memory hash table
+    max_open = max # of partition files to write (and have open) at once;
+               default is 128, or half of the process's open file limit if
+               that's lower
+
+    The smaller file is loaded into a hash table, and the larger file is
+    streamed through it. If the smaller file won't fit in max_memory, both
+    files are first split into partitions (temporary files) by key, and then
+    each pair of partitions is joined; if more than max_open partitions are
+    needed, partitions are split again in further passes. Output rows are
+    written as they are found, so their order may not match either input
+    file. Rows with a blank key don't match any rows.
+
+    Returns the number of rows written to outfile.
+    """
+    if how not in ("inner", "left"):
+        print("ERROR: csv_join() how must be 'inner' or 'left'")
+        return None
+
+    left_on, right_on = (on, on) if isinstance(on, str) else on
+    with open(leftfile, "r", newline="") as fhandle:
+        left_header = next(csv.reader(fhandle), [])
+    with open(rightfile, "r", newline="") as fhandle:
+        right_header = next(csv.reader(fhandle), [])
+    left_names = [fieldname.lower() for fieldname in left_header]
+    right_names = [fieldname.lower() for fieldname in right_header]
+    if left_on.lower() not in left_names or right_on.lower() not in right_names:
+        print("ERROR: csv_join() key column not found: " + str(on))
+        return None
+    left_key = left_names.index(left_on.lower())
+    right_key = right_names.index(right_on.lower())
+
+    # projection = (0 for left/1 for right, column #) for each output column
+    if not columns:
+        # by position, so that columns with the same name in both files are
+        # each written from their own file
+        columns = left_header + [
+            fieldname
+            for fieldno, fieldname in enumerate(right_header)
+            if fieldno != right_key
+        ]
+        projection = [(0, fieldno) for fieldno in range(len(left_header))] + [
+            (1, fieldno) for fieldno in range(len(right_header)) if fieldno != right_key
+        ]
+    else:
+        projection = []
+        for colname in columns:
+            side, _, qualified = colname.lower().partition(".")
+            if colname.lower() in left_names:
+                projection.append((0, left_names.index(colname.lower())))
+            elif colname.lower() in right_names:
+                projection.append((1, right_names.index(colname.lower())))
+            elif side == "left" and qualified in left_names:
+                projection.append((0, left_names.index(qualified)))
+            elif side == "right" and qualified in right_names:
+                projection.append((1, right_names.index(qualified)))
+            else:
+                print("ERROR: csv_join() column not found: " + colname)
+                return None
+
+    join = {
+        "build_left": filesize(leftfile) <= filesize(rightfile),
+        "left_key": left_key,
+        "right_key": right_key,
+        "how": how,
+        "lower": lower,
+        "projection": projection,
+        "blank_right": [""] * len(right_header),
+        "left_width": len(left_header),
+        "right_width": len(right_header),
+        "max_memory": max_memory,
+        "max_open": max_open if max_open else _max_open_files(),
+    }
+
+    with open(outfile, "w", newline="") as fhandle:
+        csvwriter = csv.writer(fhandle, dialect="excel")
+        csvwriter.writerow(columns)
+        with tempfile.TemporaryDirectory() as tempdir:
+            return _csv_join_files(leftfile, rightfile, True, join, csvwriter, tempdir)
+
+
+def _csv_join_files(leftfile, rightfile, header, join, csvwriter, tempdir, depth=0):
+    """Hash join two CSV files for csv_join(), writing the joined rows to
+    csvwriter. Returns the number of rows written.
+
+    If the build side won't fit in join["max_memory"], both files are split
+    into at most join["max_open"] partitions by key, and each pair of
+    partitions is joined by calling this function recursively, so large
+    files may be partitioned in several passes.
+    """
+    leftrows = _csv_rows(leftfile, header=header, width=join["left_width"])
+    rightrows = _csv_rows(rightfile, header=header, width=join["right_width"])
+
+    # Python strings and lists take several times the file size in memory,
+    # so allow for that when deciding whether to partition
+    buildfile = leftfile if join["build_left"] else rightfile
+    partitions = math.ceil(4 * filesize(buildfile) / join["max_memory"])
+
+    # after several passes, a partition that is still too large is mostly
+    # rows with the same key, which further partitioning won't split up
+    if partitions <= 1 or depth >= 4:
+        return _csv_join_partition(leftrows, rightrows, join, csvwriter)
+
+    partitions = min(partitions, join["max_open"])
+    left_parts = _csv_partition(
+        leftrows,
+        join["left_key"],
+        partitions,
+        depth,
+        join,
+        tempdir,
+        keep_blank=join["how"] == "left",
+    )
+    right_parts = _csv_partition(
+        rightrows, join["right_key"], partitions, depth, join, tempdir
+    )
+    rowcount = 0
+    for left_part, right_part in zip(left_parts, right_parts):
+        rowcount += _csv_join_files(
+            left_part, right_part, False, join, csvwriter, tempdir, depth + 1
+        )
+        os.remove(left_part)
+        os.remove(right_part)
+    return rowcount
+
+
+def _csv_join_partition(leftrows, rightrows, join, csvwriter):
+    """Hash join two sets of CSV rows for csv_join(), writing the joined rows
+    to csvwriter. Returns the number of rows written.
+
+    Rows with a blank key never match; for a left join, left rows with a
+    blank key are written once, with blank right columns.
+    """
+    build_left = join["build_left"]
+    if build_left:
+        buildrows, proberows = leftrows, rightrows
+        build_key, probe_key = join["left_key"], join["right_key"]
+    else:
+        buildrows, proberows = rightrows, leftrows
+        build_key, probe_key = join["right_key"], join["left_key"]
+    lower = join["lower"]
+    projection = join["projection"]
+    blank_right = join["blank_right"]
+    left_join = join["how"] == "left"
+
+    rowcount = 0
+    hashtable = dict()
+    for row in buildrows:
+        key = row[build_key].strip()
+        if key:
+            hashtable.setdefault(key.lower() if lower else key, []).append(row)
+        elif left_join and build_left:
+            pair = (row, blank_right)
+            csvwriter.writerow([pair[side][colno] for side, colno in projection])
+            rowcount += 1
+
+    matched = set()  # keys matched, if the build side is the left side
+    for row in proberows:
+        key = row[probe_key].strip()
+        key = key.lower() if lower else key
+        buildmatches = hashtable.get(key) if key else None
+        if buildmatches:
+            if build_left:
+                matched.add(key)
+            for buildrow in buildmatches:
+                pair = (buildrow, row) if build_left else (row, buildrow)
+                csvwriter.writerow([pair[side][colno] for side, colno in projection])
+                rowcount += 1
+        elif left_join and not build_left:
+            pair = (row, blank_right)
+            csvwriter.writerow([pair[side][colno] for side, colno in projection])
+            rowcount += 1
+
+    if left_join and build_left:
+        # left rows that had no match in the right side
+        for key, buildrows in hashtable.items():
+            if key in matched:
+                continue
+            for buildrow in buildrows:
+                pair = (buildrow, blank_right)
+                csvwriter.writerow([pair[side][colno] for side, colno in projection])
+                rowcount += 1
+
+    return rowcount
+
+
+def _csv_partition(
+    rows, key_column, partitions, depth, join, tempdir, keep_blank=False
+):
+    """Split the rows of a CSV file (as returned by _csv_rows()) into
+    partitions (temporary CSV files with no header row) by the hash of a key
+    column, for csv_join(). The hash includes depth (the partitioning pass),
+    so that a partition is split up further on the next pass.
+
+    Rows with a blank key can't match, so they're dropped unless keep_blank
+    is True (for the left side of a left join).
+
+    Returns a list of the partition filenames.
+    """
+    lower = join["lower"]
+    handles = [
+        tempfile.NamedTemporaryFile(
+            "w", dir=tempdir, suffix=".csv", newline="", delete=False
+        )
+        for _ in range(partitions)
+    ]
+    csvwriters = [csv.writer(fhandle, dialect="excel") for fhandle in handles]
+    for row in rows:
+        key = row[key_column].strip()
+        if not key and not keep_blank:
+            continue
+        key = key.lower() if lower else key
+        csvwriters[hash((depth, key)) % partitions].writerow(row)
+    for fhandle in handles:
+        fhandle.close()
+    return [fhandle.name for fhandle in handles]
+
+
+def _csv_rows(filename, header=True, width=0):
+    """Generate the rows of a CSV file as lists of values, skipping over the
+    header row if header is True.
+
+    Blank rows are skipped, and rows with fewer than width values are padded
+    with empty values.
+    """
+    with open(filename, "r", newline="") as fhandle:
+        csvreader = csv.reader(fhandle, delimiter=",", quotechar='"')
+        if header:
+            next(csvreader, None)
+        for row in csvreader:
+            if not any(value.strip() for value in row):
+                continue  # blank row
+            if len(row) < width:
+                row.extend([""] * (width - len(row)))
+            yield row
+
+
 def csv2dict(filename, key_column, val_column, lower=True, header=True):
     """
     Create a dictionary from two columns in a CSV file.
@@ -294,25 +560,127 @@ def csv2list(filename, column, lower=True, header=True, dedupe=True):
     header = whether .CSV file has a header row as the first line
     dedupe = whether to remove duplicate values
 
-    Returns the list.
+    Returns the list. For files too large to sort in memory, see csv2sorted().
     """
     thelist = []
-    firstline = True
-    for line in open(filename, "r").readlines():
-        if firstline and header:
-            firstline = False
-            continue  # skip over the header line
-        listval = (
-            line.split(",")[column].strip().lower()
-            if lower
-            else line.split(",")[column].strip()
-        )
-        thelist.append(listval)
+    with open(filename, "r") as fhandle:
+        if header:
+            next(fhandle, None)  # skip over the header line
+        for line in fhandle:
+            listval = line.split(",")[column].strip()
+            thelist.append(listval.lower() if lower else listval)
 
     if dedupe:
-        return sorted(list(set(thelist)))
+        return sorted(set(thelist))
+
+    thelist.sort()
+    return thelist
+
+
+def csv2sorted(
+    filename,
+    column,
+    lower=True,
+    header=True,
+    dedupe=True,
+    max_memory=256 * 1024 * 1024,
+    max_open=None,
+):
+    """
+    Generate the sorted values of a column in a CSV file, for files that may
+    be too large to sort in memory.
+
+    filename = name of .CSV file
+    column = column # (0-based) to be returned
+    lower = whether to make the values lowercase
+    header = whether .CSV file has a header row as the first line
+    dedupe = whether to remove duplicate values
+    max_memory = approximate # bytes of values to hold in memory at once
+    max_open = max # of temporary files to merge (and have open) at once;
+               default is 128, or half of the process's open file limit if
+               that's lower
+
+    Values are sorted in runs that fit in max_memory; each run is written to
+    a temporary file, and the runs are then merged. If there are more than
+    max_open runs, they're merged in multiple passes. Returns a generator
+    that yields the same values, in the same order, as csv2list().
+    """
+    with tempfile.TemporaryDirectory() as tempdir:
+        runfiles = []
+        run = []
+        run_bytes = 0
+        with open(filename, "r") as fhandle:
+            if header:
+                next(fhandle, None)  # skip over the header line
+            for line in fhandle:
+                listval = line.split(",")[column].strip()
+                run.append(listval.lower() if lower else listval)
+                run_bytes += sys.getsizeof(run[-1]) + 8  # 8 = list pointer
+                if run_bytes >= max_memory:
+                    run.sort()
+                    runfiles.append(_csv2sorted_write(run, dedupe, tempdir))
+                    run = []
+                    run_bytes = 0
+
+        if not runfiles:
+            # everything fit in memory, so no need for temporary files
+            yield from sorted(set(run)) if dedupe else sorted(run)
+            return
+
+        if run:
+            run.sort()
+            runfiles.append(_csv2sorted_write(run, dedupe, tempdir))
+        run = None  # release the last run's memory before merging
+
+        # merge groups of max_open runs into longer runs, until there are few
+        # enough runs to merge them all at once
+        max_open = max(max_open if max_open else _max_open_files(), 2)
+        while len(runfiles) > max_open:
+            merged_runs = []
+            for groupno in range(0, len(runfiles), max_open):
+                group = runfiles[groupno : groupno + max_open]
+                merged_runs.append(
+                    _csv2sorted_write(_csv2sorted_merge(group, dedupe), False, tempdir)
+                )
+                for runfile in group:
+                    os.remove(runfile)
+            runfiles = merged_runs
+
+        yield from _csv2sorted_merge(runfiles, dedupe)
+
+
+def _csv2sorted_merge(runfiles, dedupe):
+    """Generate the merged values of sorted temporary files for csv2sorted().
+    """
+    runhandles = []
+    try:
+        for runfile in runfiles:
+            runhandles.append(open(runfile, "r"))
+        merged = heapq.merge(
+            *[(line[:-1] for line in runhandle) for runhandle in runhandles]
+        )
+        if dedupe:
+            merged = (value for value, _ in itertools.groupby(merged))
+        yield from merged
+    finally:
+        for runhandle in runhandles:
+            runhandle.close()
+
 
-    return sorted(thelist)
+def _csv2sorted_write(values, dedupe, tempdir):
+    """Write sorted values to a temporary file, one value per line, for
+    csv2sorted(). Returns the name of the temporary file.
+    """
+    with tempfile.NamedTemporaryFile(
+        "w", dir=tempdir, suffix=".run", delete=False
+    ) as fhandle:
+        previous = None
+        for value in values:
+            if dedupe and value == previous:
+                continue
+            fhandle.write(value + "\n")
+            previous = value
+    return fhandle.name
 
 
 def days_since(datestr):
@@ -423,6 +791,23 @@ def list_projection(values, columns):
     return ",".join(returned)
 
 
+def _max_open_files():
+    """Return the default # of temporary files for csv2sorted() and csv_join()
+    to have open at once: 128, or half of the process's open file limit if
+    that's lower.
+    """
+    max_open = 128
+    try:
+        import resource  # not available on Windows
+
+        soft_limit = resource.getrlimit(resource.RLIMIT_NOFILE)[0]
+        if soft_limit > 0:
+            max_open = min(max_open, soft_limit // 2)
+    except ImportError:
+        pass
+    return max_open
+
+
 def percent(count, total):
     """Return a percent value, or 0 if undefined.
     Arguments may float, int, or str.
@@ -508,44 +893,188 @@ def sub_dir(searchfor, folder=None):
     return hits
 
 
-def sysinfo(newline=None):
+def sysinfo(newline=None, timeout=1.0, ttl=60):
     """Return system information.
 
     newline = delimiter for returned list of key/value pairs; if not
               specified, a dictionary of key/value pairs is returned
+    timeout = max # seconds to wait for values that haven't been retrieved
+              yet (such as the DNS lookup for HOST_IPADDR); values not
+              available in time are returned as '(timeout)'
+    ttl = # seconds before dynamic values (disk usage, memory, load
+          average) are refreshed
 
     Since this information is typically used for diagnostic printing or
     displaying of values, all vaues are returned as strings.
+
+    Static values are only retrieved once per process. Dynamic values are
+    refreshed in the background once they're older than ttl, and the prior
+    values are returned in the meantime, so calls after the first one don't
+    block. Values that aren't available on the current platform are 'n/a'.
     """
+    # start all probes first, so that they run concurrently
+    for probe in _SYSINFO_PROBES.values():
+        probe.refresh(ttl)
+    _SYSINFO_DISK.refresh(ttl)
+
+    deadline = default_timer() + timeout
     sys_info = dict()
-    sys_info["PY_VERSION"] = sys.version.strip().split(" ")[0] + (
-        " (64-bit)" if "64 bit" in sys.version else " (32-bit)"
-    )
-    sys_info["PY_LOCATION"] = sys.prefix
-    sys_info["PY_PACKAGES"] = ",".join([_ for _ in pkg_resources.working_set])
-    sys_info["PY_PATH"] = ",".join(sys.path)
-    sys_info["OS_VERSION"] = platform.platform()
-    sys_info["HOST_NAME"] = socket.gethostname()
-    sys_info["HOST_PROC"] = (
-        os.environ["PROCESSOR_ARCHITECTURE"]
-        + ", "
-        + os.environ["PROCESSOR_IDENTIFIER"].split(" ")[0]
-        + ", "
-        + os.environ["NUMBER_OF_PROCESSORS"]
-        + " cores"
-    )
-    sys_info["HOST_IPADDR"] = socket.gethostbyname(socket.gethostname())
+    for key, probe in _SYSINFO_PROBES.items():
+        sys_info[key] = probe.value(deadline)
     sys_info["DIRECTORY"] = os.getcwd()
-    size, used, free = shutil.disk_usage("/")
-    sys_info["DISK_SIZE"] = "{:,}".format(size)
-    sys_info["DISK_USED"] = "{:,}".format(used)
-    sys_info["DISK_FREE"] = "{:,}".format(free)
+
+    # disk size/used/free all come from the same snapshot
+    disk = _SYSINFO_DISK.value(deadline)
+    if isinstance(disk, str):
+        disk = (disk, disk, disk)  # '(timeout)' or 'n/a'
+    sys_info["DISK_SIZE"], sys_info["DISK_USED"], sys_info["DISK_FREE"] = disk
 
     if newline:
         return newline.join([key + ": " + sys_info[key] for key in sorted(sys_info)])
     return sys_info
 
 
+class _SysinfoProbe:
+    """A single sysinfo() value, retrieved in a background thread and cached.
+
+    func = function that returns the value as a string (or a tuple of
+           strings, for values that are retrieved together)
+    static = whether the value never changes during the life of the process
+    """
+
+    def __init__(self, func, static=True):
+        self.func = func
+        self.static = static
+        self.result = None
+        self.updated = None  # default_timer() when result was retrieved
+        self.thread = None  # background thread, while retrieving the value
+
+    def refresh(self, ttl):
+        """Start retrieving the value, if it hasn't been retrieved yet or
+        (for dynamic values) is older than ttl seconds.
+        """
+        with _SYSINFO_LOCK:
+            if self.thread:
+                return  # already being retrieved
+            if self.updated is not None and (
+                self.static or default_timer() - self.updated < ttl
+            ):
+                return  # cached value is current
+            self.thread = threading.Thread(target=self._retrieve, daemon=True)
+            self.thread.start()
+
+    def value(self, deadline):
+        """Return the value. If it has never been retrieved, wait until
+        deadline (a default_timer() value) for it.
+        """
+        thread = self.thread
+        if self.result is None and thread:
+            thread.join(max(0, deadline - default_timer()))
+        return "(timeout)" if self.result is None else self.result
+
+    def _retrieve(self):
+        try:
+            result = self.func()
+        except Exception:
+            # a diagnostic value should never crash the caller
+            result = "n/a"
+        with _SYSINFO_LOCK:
+            self.result = result
+            self.updated = default_timer()
+            self.thread = None
+
+
+def _sysinfo_host_proc():
+    """Return processor architecture/model/cores for sysinfo().
+    """
+    if "PROCESSOR_IDENTIFIER" in os.environ:
+        # Windows
+        model = os.environ["PROCESSOR_IDENTIFIER"].split(" ")[0]
+    else:
+        model = _sysinfo_proc("/proc/cpuinfo").get("model name", "n/a")
+    return (
+        os.environ.get("PROCESSOR_ARCHITECTURE", platform.machine())
+        + ", "
+        + model
+        + ", "
+        + str(os.cpu_count())
+        + " cores"
+    )
+
+
+def _sysinfo_loadavg():
+    """Return the 1/5/15-minute load averages for sysinfo().
+    """
+    if not hasattr(os, "getloadavg"):
+        return "n/a"  # Windows
+    return ", ".join("{0:.2f}".format(load) for load in os.getloadavg())
+
+
+def _sysinfo_memory(field):
+    """Return a field from /proc/meminfo (e.g., 'MemTotal') as a byte count
+    string for sysinfo(), or 'n/a' if not available.
+    """
+    value = _sysinfo_proc("/proc/meminfo").get(field)
+    if not value:
+        return "n/a"
+    return "{:,}".format(int(value.split(" ")[0]) * 1024)  # value is in kB
+
+
+def _sysinfo_packages():
+    """Return the installed packages for sysinfo().
+    """
+    # imported here because importing pkg_resources scans every installed
+    # package, which is slow and only needed for sysinfo()
+    import pkg_resources
+
+    return ",".join([str(_) for _ in pkg_resources.working_set])
+
+
+def _sysinfo_proc(filename):
+    """Parse a Linux /proc file of 'name: value' lines (such as /proc/meminfo
+    or /proc/cpuinfo) into a dictionary. The first occurrence of each name is
+    used. Returns an empty dictionary if the file doesn't exist.
+    """
+    values = dict()
+    if not os.path.isfile(filename):
+        return values
+    with open(filename, "r") as fhandle:
+        for line in fhandle:
+            name, _, value = line.partition(":")
+            values.setdefault(name.strip(), value.strip())
+    return values
+
+
+_SYSINFO_LOCK = threading.Lock()
+
+# the probes for each sysinfo() value, except DIRECTORY (which is retrieved
+# on every call because it's cheap and changes often) and disk usage
+_SYSINFO_PROBES = {
+    "PY_VERSION": _SysinfoProbe(
+        lambda: sys.version.strip().split(" ")[0]
+        + (" (64-bit)" if sys.maxsize > 2**32 else " (32-bit)")
+    ),
+    "PY_LOCATION": _SysinfoProbe(lambda: sys.prefix),
+    "PY_PACKAGES": _SysinfoProbe(_sysinfo_packages),
+    "PY_PATH": _SysinfoProbe(lambda: ",".join(sys.path), static=False),
+    "OS_VERSION": _SysinfoProbe(platform.platform),
+    "HOST_NAME": _SysinfoProbe(socket.gethostname),
+    "HOST_PROC": _SysinfoProbe(_sysinfo_host_proc),
+    "HOST_IPADDR": _SysinfoProbe(lambda: socket.gethostbyname(socket.gethostname())),
+    "HOST_LOADAVG": _SysinfoProbe(_sysinfo_loadavg, static=False),
+    "MEM_TOTAL": _SysinfoProbe(lambda: _sysinfo_memory("MemTotal")),
+    "MEM_AVAILABLE": _SysinfoProbe(
+        lambda: _sysinfo_memory("MemAvailable"), static=False
+    ),
+}
+
+# DISK_SIZE, DISK_USED and DISK_FREE, as a tuple from a single disk_usage()
+_SYSINFO_DISK = _SysinfoProbe(
+    lambda: tuple("{:,}".format(value) for value in shutil.disk_usage("/")),
+    static=False,
+)
+
+
 def time_stamp(filename=None):
     """Return timestamp as a string.
 
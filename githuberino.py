@@ -3,12 +3,29 @@
 Copyright 2015-2017 by Doug Mahugh. All Rights Reserved.
 Licensed under the MIT License.
 """
+import collections
 import configparser
+import datetime
 import json
 import os
+import re
+import urllib.parse
 
 import requests
 
+# GitHub's limit on the total number of nodes a single GraphQL call may request
+GRAPHQL_MAX_NODES = 500000
+
+# tokens used by github_graphql_cost(): first:/last: arguments, braces and
+# parentheses
+GRAPHQL_COST_REGEX = re.compile(r'\b(?:first|last)\s*:\s*(?P<count>\d+)|[{}()]')
+
+# each link in a 'link' HTTP header; e.g., <url>; rel="next"
+LINK_REGEX = re.compile(r'<([^>]*)>\s*;\s*rel="([^"]*)"')
+
+# the page query parameter of a link's URL, if it's a number
+LINK_PAGE_REGEX = re.compile(r'[?&]page=(\d+)(?:[&#]|$)', re.ASCII)
+
 def github_allpages(endpoint=None, auth=None, #------------------------------<<<
                     headers=None, state=None, session=None):
 
@@ -50,6 +67,213 @@ def github_allpages(endpoint=None, auth=None, #------------------------------<<<
 
     return payload
 
+def github_graphql(*, query=None, variables=None, auth=None, #---------------<<<
+                   headers=None, state=None, session=None,
+                   endpoint='https://api.github.com/graphql'):
+    """Call the GitHub GraphQL (V4) API.
+
+    query        = the GraphQL query string
+    variables    = optional dictionary of GraphQL variables
+    endpoint     = the GraphQL endpoint; defaults to GitHub's endpoint, but
+                   can be overridden (for example, a local stub endpoint for
+                   testing, or a GitHub Enterprise server)
+
+    The auth, headers, state and session arguments are used as described
+    for github_rest_api().
+
+    Returns the response object.
+    """
+    if not query:
+        print('ERROR: github_graphql() called with no query')
+        return None
+
+    auth = _github_auth(auth)
+    headers = {} if not headers else headers
+
+    sess = _github_session(state=state, session=session)
+    sess.auth = auth
+    payload = {'query': query}
+    if variables:
+        payload['variables'] = variables
+    response = sess.post(endpoint, json=payload, headers=headers)
+
+    if state and state.verbose:
+        print('    GraphQL: {0} bytes of query'.format(len(query)))
+
+    _github_ratelimit(response=response, auth=auth, state=state)
+
+    return response
+
+def github_graphql_allpages(*, query=None, path=None, variables=None, #------<<<
+                            auth=None, headers=None, state=None,
+                            session=None,
+                            endpoint='https://api.github.com/graphql'):
+    """Get all pages of a GraphQL connection, using cursor pagination.
+
+    query        = the GraphQL query string; must declare a $cursor: String
+                   variable, pass it as the after: argument of the paged
+                   connection, and request pageInfo {hasNextPage endCursor}
+                   for that connection
+    path         = dot-delimited path to the paged connection within the
+                   returned data; e.g., 'organization.repositories'
+    variables    = optional dictionary of other GraphQL variables
+
+    Other arguments are as described for github_graphql().
+
+    Returns the nodes as a list of dictionaries, or None if no path is
+    specified. This is the GraphQL equivalent of github_allpages(), which
+    uses Link headers.
+    """
+    if not path:
+        print('ERROR: github_graphql_allpages() called with no path')
+        return None
+
+    variables = {} if not variables else dict(variables)
+
+    payload = [] # the full data set (all pages)
+    cursor = None
+
+    while True:
+        response = github_graphql(query=query, \
+            variables={**variables, 'cursor': cursor}, auth=auth, \
+            headers=headers, state=state, session=session, endpoint=endpoint)
+        if response is None:
+            break
+        if (state and state.verbose) or response.status_code != 200:
+            print('      Status: {0}, {1} bytes returned'. \
+                format(response, len(response.text)))
+
+        jsondata = _graphql_json(response)
+        if jsondata.get('errors'):
+            print('      Errors: {0}'.format(jsondata['errors']))
+        connection = _item_field(jsondata.get('data') or {}, path)
+        if not connection:
+            break
+
+        if 'nodes' in connection:
+            payload.extend(connection['nodes'])
+        else:
+            payload.extend([edge['node'] for edge in connection.get('edges', [])])
+
+        pageinfo = connection.get('pageInfo', {})
+        if not pageinfo.get('hasNextPage'):
+            break # no more results to process
+        cursor = pageinfo['endCursor']
+
+    return payload
+
+def github_graphql_batch(fragments, *, max_nodes=GRAPHQL_MAX_NODES, #--------<<<
+                         max_aliases=100, auth=None, headers=None,
+                         state=None, session=None,
+                         endpoint='https://api.github.com/graphql'):
+    """Run many GraphQL lookups as a small number of aliased queries.
+
+    fragments    = the lookups to run, either as a dictionary of
+                   alias:fragment or a list of fragments. Each fragment is a
+                   top-level query field; for example,
+                   'repository(owner:"dmahugh", name:"dougerino") {name}'
+    max_nodes    = maximum node cost (see github_graphql_cost()) of a single
+                   query; batches are split so that each query stays under it
+    max_aliases  = maximum number of fragments in a single query
+
+    Other arguments are as described for github_graphql().
+
+    Returns the data for each fragment, as a dictionary keyed by alias (if
+    fragments was a dictionary) or a list in the same order as fragments.
+    Lookups that failed have a value of None.
+
+    If GitHub rejects a batch as too expensive or times out, the batch is
+    split in half and each half is retried.
+    """
+    if isinstance(fragments, dict):
+        aliased = list(fragments.items())
+    else:
+        aliased = [('q' + str(fragno), fragment)
+                   for fragno, fragment in enumerate(fragments)]
+
+    # group the fragments into batches under the node and alias limits
+    batches = []
+    batch = []
+    batch_cost = 0
+    for alias, fragment in aliased:
+        cost = github_graphql_cost(fragment)
+        if batch and (batch_cost + cost > max_nodes or len(batch) >= max_aliases):
+            batches.append(batch)
+            batch = []
+            batch_cost = 0
+        batch.append((alias, fragment))
+        batch_cost += cost
+    if batch:
+        batches.append(batch)
+
+    results = dict()
+    while batches:
+        batch = batches.pop(0)
+        query = '{\n' + '\n'.join(alias + ': ' + fragment
+                                  for alias, fragment in batch) + '\n}'
+        response = github_graphql(query=query, auth=auth, headers=headers, \
+            state=state, session=session, endpoint=endpoint)
+        if response is None:
+            break # no query, so all lookups failed
+        if (state and state.verbose) or response.status_code != 200:
+            print('      Status: {0}, {1} aliases, {2} bytes returned'. \
+                format(response, len(batch), len(response.text)))
+
+        jsondata = _graphql_json(response)
+        errortypes = [error.get('type') for error in jsondata.get('errors', [])
+                      if isinstance(error, dict)]
+        too_big = response.status_code in (502, 504) or \
+            'MAX_NODE_LIMIT_EXCEEDED' in errortypes
+        if too_big and len(batch) > 1:
+            # split the batch in half and retry each half
+            half = len(batch) // 2
+            batches[0:0] = [batch[:half], batch[half:]]
+            continue
+
+        data = jsondata.get('data') or {}
+        for alias, _ in batch:
+            results[alias] = data.get(alias)
+
+    if isinstance(fragments, dict):
+        return {alias: results.get(alias) for alias, _ in aliased}
+    return [results.get(alias) for alias, _ in aliased]
+
+def github_graphql_cost(fragment): #-----------------------------------------<<<
+    """Estimate the node cost of a GraphQL query or fragment.
+
+    This uses the same approach as GitHub's node limit calculation: each
+    connection requested with a first: or last: argument costs that many
+    nodes, multiplied by the first/last values of the connections it is
+    nested within. A fragment with no connections costs 1 node.
+
+    Returns the estimated number of nodes as an int.
+    """
+    total = 0
+    multipliers = [1] # node multiplier for each nesting level
+    pending = None # first/last value for the next { to be opened
+    argdepth = 0 # nesting depth of argument lists; e.g., (orderBy:{...})
+
+    for token in GRAPHQL_COST_REGEX.finditer(fragment):
+        if token.group('count'):
+            pending = int(token.group('count'))
+        elif token.group(0) == '(':
+            argdepth += 1
+        elif token.group(0) == ')':
+            argdepth = max(argdepth - 1, 0)
+        elif argdepth:
+            continue # braces of an input object argument, not a selection set
+        elif token.group(0) == '{':
+            if pending is None:
+                multipliers.append(multipliers[-1])
+            else:
+                multipliers.append(multipliers[-1] * pending)
+                total += multipliers[-1]
+                pending = None
+        elif len(multipliers) > 1:
+            multipliers.pop()
+
+    return max(total, 1)
+
 def github_pagination(link_header): #----------------------------------------<<<
     """Parse values from the 'link' HTTP header returned by GitHub API.
 
@@ -57,14 +281,12 @@ def github_pagination(link_header): #----------------------------------------<<<
                     - 'link' HTTP header passed as a string
                     - response object returned by requests library
 
-    Returns a dictionary with entries for the URLs and page numbers parsed
-    from the link string: firstURL, firstpage, prevURL, prevpage, nextURL,
-    nextpage, lastURL, lastpage.
+    Returns a PageLinks object with the URLs and page numbers parsed from the
+    link string: firstURL, firstpage, prevURL, prevpage, nextURL, nextpage,
+    lastURL, lastpage. These can be accessed as attributes or as dictionary
+    keys; e.g., pagelinks.nextURL or pagelinks['nextURL']. Page numbers
+    are ints, from the page query parameter wherever it appears in the URL.
     """
-    # initialize the dictionary
-    retval = {'firstpage':0, 'firstURL':None, 'prevpage':0, 'prevURL':None,
-              'nextpage':0, 'nextURL':None, 'lastpage':0, 'lastURL':None}
-
     if isinstance(link_header, str):
         link_string = link_header
     else:
@@ -72,19 +294,9 @@ def github_pagination(link_header): #----------------------------------------<<<
         try:
             link_string = link_header.headers['Link']
         except KeyError:
-            return retval # no Link HTTP header found, nothing to parse
-
-    links = link_string.split(',')
-    for link in links:
-        # link format = '<url>; rel="type"'
-        linktype = link.split(';')[-1].split('=')[-1].strip()[1:-1]
-        url = link.split(';')[0].strip()[1:-1]
-        pageno = url.split('?')[-1].split('=')[-1].strip()
+            link_string = '' # no Link HTTP header found, nothing to parse
 
-        retval[linktype + 'page'] = pageno
-        retval[linktype + 'URL'] = url
-
-    return retval
+    return _parse_links(link_string)
 
 def github_rest_api(*, endpoint=None, auth=None, headers=None, #-------------<<<
                     state=None, session=None):
@@ -115,33 +327,14 @@ def github_rest_api(*, endpoint=None, auth=None, headers=None, #-------------<<<
         print('ERROR: github_api() called with no endpoint')
         return None
 
-    # set auth to default if needed
-    if not auth:
-        default_account = setting('dougerino', 'defaults', 'github_user')
-        if default_account:
-            auth = (default_account, setting('github', default_account, 'pat'))
-        else:
-            auth = () # no auth specified, and no default account found
+    auth = _github_auth(auth)
 
     # add the V3 Accept header to the dictionary
     headers = {} if not headers else headers
     headers_dict = {**{"Accept": "application/vnd.github.v3+json"}, **headers}
 
     # make the API call
-    if session:
-        sess = session # explictly passed Requests session
-    elif state:
-        if state.requests_session:
-            sess = state.requests_session # Requests session on the state objet
-        else:
-            sess = requests.session() # create a new Requests session
-            state.requests_session = sess # save it in the state object
-    else:
-        # if no state or session specified, create a temporary Requests
-        # session to use below. Note it's not saved/re-used in this scenario
-        # so performance won't be optimized.
-        sess = requests.session()
-
+    sess = _github_session(state=state, session=session)
     sess.auth = auth
     full_endpoint = 'https://api.github.com' + endpoint if endpoint[0] == '/' \
         else endpoint
@@ -150,29 +343,234 @@ def github_rest_api(*, endpoint=None, auth=None, headers=None, #-------------<<<
     if state and state.verbose:
         print('    Endpoint: ' + endpoint)
 
-    if state:
-        # update rate-limit settings
-        try:
-            state.last_ratelimit = int(response.headers['X-RateLimit-Limit'])
-            state.last_remaining = int(response.headers['X-RateLimit-Remaining'])
-        except KeyError:
-            # This is the strange and rare case (which we've encountered) where
-            # an API call that normally returns the rate-limit headers doesn't
-            # return them. Since these values are only used for monitoring, we
-            # use nonsensical values here that will show it happened, but won't
-            # crash a long-running process.
-            state.last_ratelimit = 999999
-            state.last_remaining = 999999
-
-        if state.verbose:
-            # display rate-limite status
-            username = auth[0] if auth else '(non-authenticated)'
-            used = state.last_ratelimit - state.last_remaining
-            print('  Rate Limit: {0} available, {1} used, {2} total for {3}'. \
-                format(state.last_remaining, used, state.last_ratelimit, username))
+    _github_ratelimit(response=response, auth=auth, state=state)
 
     return response
 
+def github_sync(endpoint=None, datafile=None, *, key='id', #-----------------<<<
+                timestamp='updated_at', syncfile=None, reconcile_days=7,
+                auth=None, headers=None, state=None, session=None):
+    """Incrementally sync data from a GitHub REST API endpoint to a local file.
+
+    endpoint       = HTTP endpoint for GitHub API call; must support the since
+                     query parameter (e.g., '/repos/dmahugh/dougerino/issues')
+    datafile       = local JSON-lines file that holds the synced data set
+    key            = field that uniquely identifies each item (e.g., 'sha'
+                     for commits); dot-delimited for nested fields
+    timestamp      = field that holds each item's last-updated timestamp;
+                     dot-delimited for nested fields (e.g., for commits,
+                     'commit.committer.date')
+    syncfile       = JSON file where the high-water mark for each endpoint is
+                     stored; default is datafile + '.sync'
+    reconcile_days = # days between full reconciliations, which re-fetch the
+                     complete data set so that deleted items are removed;
+                     0 = always do a full reconciliation
+
+    Other arguments are as described for github_allpages().
+
+    Only items created or updated since the last sync are fetched, and they
+    are merged into the existing data set by key. Returns the merged data set
+    as a list of dictionaries, or None if any page of the API call failed or
+    any item has no key value (in which case the data set and high-water mark
+    are left unchanged).
+    """
+    if not endpoint or not datafile:
+        print('ERROR: github_sync() called with no endpoint or datafile')
+        return None
+
+    syncfile = datafile + '.sync' if not syncfile else syncfile
+    syncdata = {}
+    if os.path.isfile(syncfile):
+        with open(syncfile, 'r') as fhandle:
+            syncdata = json.loads(fhandle.read())
+    marks = syncdata.get(endpoint, {})
+
+    now = datetime.datetime.utcnow().strftime('%Y-%m-%dT%H:%M:%SZ')
+    last_full = marks.get('last_full')
+    full_sync = not marks.get('since') or not os.path.isfile(datafile) or \
+        not last_full or reconcile_days <= 0 or \
+        datetime.datetime.strptime(last_full, '%Y-%m-%dT%H:%M:%SZ') + \
+        datetime.timedelta(days=reconcile_days) <= datetime.datetime.utcnow()
+
+    dataset = collections.OrderedDict()
+    if os.path.isfile(datafile):
+        with open(datafile, 'r') as fhandle:
+            for line in fhandle:
+                if line.strip():
+                    item = json.loads(line)
+                    dataset[_item_field(item, key)] = item
+
+    if full_sync:
+        page_endpoint = endpoint
+    else:
+        page_endpoint = endpoint + ('&' if '?' in endpoint else '?') + \
+            'since=' + marks['since']
+
+    if state and state.verbose:
+        print('        Sync: {0} ({1})'. \
+            format(endpoint, 'full' if full_sync else 'since ' + marks['since']))
+
+    # Note that this doesn't use github_allpages(), because it returns the
+    # pages retrieved before a failed page. A partial result would delete
+    # items in a full reconciliation, and would move the high-water mark
+    # past the pages that weren't retrieved.
+    newitems = []
+    while page_endpoint:
+        response = github_rest_api(endpoint=page_endpoint, auth=auth, \
+            headers=headers, state=state, session=session)
+        if (state and state.verbose) or response.status_code != 200:
+            print('      Status: {0}, {1} bytes returned'. \
+                format(response, len(response.text)))
+        try:
+            thispage = json.loads(response.text) if response.ok else None
+        except ValueError:
+            thispage = None
+        if not isinstance(thispage, list):
+            print('ERROR: github_sync() failed, data set not updated: ' + \
+                page_endpoint)
+            return None
+        newitems.extend(thispage)
+        page_endpoint = github_pagination(response)['nextURL']
+
+    # items without a key value would all overwrite each other under None
+    missing = sum(1 for item in newitems if _item_field(item, key) is None)
+    if missing:
+        print('ERROR: github_sync() failed, data set not updated: ' + \
+            '{0} items have no {1} field'.format(missing, key))
+        return None
+
+    if full_sync:
+        # full reconciliation: items not returned have been deleted
+        dataset = collections.OrderedDict()
+    for item in newitems:
+        dataset[_item_field(item, key)] = item
+
+    # write to a temporary file first, so that an interrupted sync doesn't
+    # leave a partial data set behind
+    with open(datafile + '.tmp', 'w') as fhandle:
+        for item in dataset.values():
+            fhandle.write(json.dumps(item, sort_keys=True) + '\n')
+    os.replace(datafile + '.tmp', datafile)
+
+    # the high-water mark is the latest timestamp in the data set; note that
+    # GitHub's since parameter is inclusive, so items updated at exactly that
+    # time are fetched again and merged by key
+    timestamps = [_item_field(item, timestamp) for item in newitems]
+    timestamps = [_ for _ in timestamps if _]
+    if timestamps:
+        marks['since'] = max([marks.get('since', '')] + timestamps)
+    if full_sync:
+        marks['last_full'] = now
+    syncdata[endpoint] = marks
+    with open(syncfile, 'w') as fhandle:
+        fhandle.write(json.dumps(syncdata, indent=4, sort_keys=True))
+
+    return list(dataset.values())
+
+class PageLinks: #-----------------------------------------------------------<<<
+    """Navigation links parsed from a GitHub API 'link' HTTP header, as
+    returned by github_pagination().
+
+    firstURL, prevURL, nextURL, lastURL = the URL for each link type, or None
+    firstpage, prevpage, nextpage, lastpage = the page # for each link type
+        (int), or 0 if not present. These are parsed from the URL when
+        accessed, because most callers only need nextURL.
+    urls = dictionary of the URL of every link, keyed by link type (including
+        link types other than first/prev/next/last)
+    params = dictionary of the query parameters of each link, keyed by link
+        type; numeric values (such as page and per_page) are ints. These are
+        only parsed when params is first accessed.
+
+    The firstURL ... lastpage values can also be accessed with the same
+    dictionary-style syntax as prior versions of github_pagination(), which
+    returned a dictionary: pagelinks['nextURL'], 'nextURL' in pagelinks,
+    pagelinks.get('nextURL'), pagelinks.keys(), dict(pagelinks), etc.
+    """
+    __slots__ = ('firstURL', 'prevURL', 'nextURL', 'lastURL', 'urls', '_params')
+
+    KEYS = ('firstpage', 'firstURL', 'prevpage', 'prevURL',
+            'nextpage', 'nextURL', 'lastpage', 'lastURL')
+
+    def __init__(self, urls=None):
+        self.urls = dict() if urls is None else urls
+        self.firstURL = self.urls.get('first')
+        self.prevURL = self.urls.get('prev')
+        self.nextURL = self.urls.get('next')
+        self.lastURL = self.urls.get('last')
+        self._params = None
+
+    @property
+    def firstpage(self):
+        """Page # of the first link.
+        """
+        return _url_page(self.firstURL)
+
+    @property
+    def prevpage(self):
+        """Page # of the prev link.
+        """
+        return _url_page(self.prevURL)
+
+    @property
+    def nextpage(self):
+        """Page # of the next link.
+        """
+        return _url_page(self.nextURL)
+
+    @property
+    def lastpage(self):
+        """Page # of the last link.
+        """
+        return _url_page(self.lastURL)
+
+    @property
+    def params(self):
+        """Query parameters of each link, parsed on first access.
+        """
+        if self._params is None:
+            self._params = {linktype: _url_params(url)
+                            for linktype, url in self.urls.items()}
+        return self._params
+
+    def __contains__(self, key):
+        return key in self.KEYS
+
+    def __getitem__(self, key):
+        if key not in self.KEYS:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __iter__(self):
+        return iter(self.KEYS)
+
+    def __len__(self):
+        return len(self.KEYS)
+
+    def get(self, key, default=None):
+        """Dictionary-style get().
+        """
+        return getattr(self, key) if key in self.KEYS else default
+
+    def items(self):
+        """Dictionary-style items().
+        """
+        return [(key, getattr(self, key)) for key in self.KEYS]
+
+    def keys(self):
+        """Dictionary-style keys().
+        """
+        return list(self.KEYS)
+
+    def values(self):
+        """Dictionary-style values().
+        """
+        return [getattr(self, key) for key in self.KEYS]
+
+    def __repr__(self):
+        return '<' + self.__class__.__name__ + ' object, ' + ', '.join(
+            key + ' = ' + str(getattr(self, key)) for key in self.KEYS
+        ) + '>'
+
 def setting(topic, section, key): #------------------------------------------<<<
     """Retrieve a private setting stored in a local .ini file.
 
@@ -192,3 +590,112 @@ def setting(topic, section, key): #------------------------------------------<<<
         retval = None
     return retval
 
+def _github_auth(auth): #----------------------------------------------------<<<
+    """Return the auth tuple to use for a GitHub API call.
+
+    If auth is not specified, the default gitHub account is
+    setting('dougerino', 'defaults', 'github_user')
+    """
+    if auth:
+        return auth
+    default_account = setting('dougerino', 'defaults', 'github_user')
+    if default_account:
+        return (default_account, setting('github', default_account, 'pat'))
+    return () # no auth specified, and no default account found
+
+def _github_ratelimit(*, response, auth, state): #---------------------------<<<
+    """Update rate-limit settings on the state object from a response.
+    """
+    if not state:
+        return
+
+    # update rate-limit settings
+    try:
+        state.last_ratelimit = int(response.headers['X-RateLimit-Limit'])
+        state.last_remaining = int(response.headers['X-RateLimit-Remaining'])
+    except KeyError:
+        # This is the strange and rare case (which we've encountered) where
+        # an API call that normally returns the rate-limit headers doesn't
+        # return them. Since these values are only used for monitoring, we
+        # use nonsensical values here that will show it happened, but won't
+        # crash a long-running process.
+        state.last_ratelimit = 999999
+        state.last_remaining = 999999
+
+    if state.verbose:
+        # display rate-limite status
+        username = auth[0] if auth else '(non-authenticated)'
+        used = state.last_ratelimit - state.last_remaining
+        print('  Rate Limit: {0} available, {1} used, {2} total for {3}'. \
+            format(state.last_remaining, used, state.last_ratelimit, username))
+
+def _github_session(*, state=None, session=None): #--------------------------<<<
+    """Return the Requests session object to use for a GitHub API call.
+
+    See github_rest_api() for how the state and session arguments are used.
+    """
+    if session:
+        return session # explictly passed Requests session
+    if state:
+        if not state.requests_session:
+            # create a new Requests session and save it in the state object
+            state.requests_session = requests.session()
+        return state.requests_session # Requests session on the state objet
+
+    # if no state or session specified, create a temporary Requests
+    # session. Note it's not saved/re-used in this scenario so performance
+    # won't be optimized.
+    return requests.session()
+
+def _graphql_json(response): #-----------------------------------------------<<<
+    """Return the JSON body of a GraphQL response as a dictionary, or an empty
+    dictionary if the call failed or the body isn't a JSON object.
+    """
+    if not response.ok:
+        return {}
+    try:
+        jsondata = json.loads(response.text)
+    except ValueError:
+        print('      ERROR: GraphQL response is not JSON')
+        return {}
+    return jsondata if isinstance(jsondata, dict) else {}
+
+def _item_field(item, field): #----------------------------------------------<<<
+    """Return a field from a dictionary; field is dot-delimited for nested
+    fields. Returns None if not found.
+    """
+    for key in field.split('.'):
+        if not isinstance(item, dict):
+            return None
+        item = item.get(key)
+    return item
+
+def _parse_links(link_string): #---------------------------------------------<<<
+    """Parse a 'link' HTTP header string into a PageLinks object.
+
+    Each link has the format '<url>; rel="type"'. This is called for every
+    page retrieved, so only the URLs are parsed here; page numbers and other
+    query parameters are parsed by PageLinks when they're accessed.
+    """
+    return PageLinks({linktype: url
+                      for url, linktype in LINK_REGEX.findall(link_string)})
+
+def _url_page(url): #--------------------------------------------------------<<<
+    """Return the page query parameter of a URL as an int, or 0 if not found
+    (or url is None).
+    """
+    if not url:
+        return 0
+    found = LINK_PAGE_REGEX.search(url)
+    return int(found.group(1)) if found else 0
+
+def _url_params(url): #------------------------------------------------------<<<
+    """Return the query parameters of a URL as a dictionary. Values that are
+    non-negative integers are returned as ints.
+    """
+    params = dict()
+    query = urllib.parse.urlsplit(url).query
+    for name, value in urllib.parse.parse_qsl(query, keep_blank_values=True):
+        params[name] = int(value) \
+            if value.isascii() and value.isdigit() else value
+    return params
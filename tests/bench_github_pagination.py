@@ -0,0 +1,53 @@
+"""Microbenchmark for github_pagination().
+
+Run from the repo root: python tests/bench_github_pagination.py
+
+Compares the split-based parser used by prior versions of githuberino with
+github_pagination(), for distinct link headers (as github_allpages() sees,
+because each page has a different header). Each scenario parses the header
+and reads nextURL and lastpage.
+"""
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from githuberino import github_pagination  # pylint: disable=C0413
+
+HEADER = ('<https://api.github.com/repositories/1300192/issues?per_page=100&page={0}>; rel="next", '
+          '<https://api.github.com/repositories/1300192/issues?per_page=100&page=515>; rel="last", '
+          '<https://api.github.com/repositories/1300192/issues?per_page=100&page=1>; rel="first", '
+          '<https://api.github.com/repositories/1300192/issues?per_page=100&page={1}>; rel="prev"')
+
+NUMBER = 100000
+
+def split_pagination(link_string):
+    """The parser used by prior versions of github_pagination().
+    """
+    retval = {'firstpage':0, 'firstURL':None, 'prevpage':0, 'prevURL':None,
+              'nextpage':0, 'nextURL':None, 'lastpage':0, 'lastURL':None}
+    for link in link_string.split(','):
+        linktype = link.split(';')[-1].split('=')[-1].strip()[1:-1]
+        url = link.split(';')[0].strip()[1:-1]
+        pageno = url.split('?')[-1].split('=')[-1].strip()
+        retval[linktype + 'page'] = pageno
+        retval[linktype + 'URL'] = url
+    return retval
+
+def main():
+    """Print the time per call for each scenario.
+    """
+    headers = [HEADER.format(pageno + 2, pageno) for pageno in range(NUMBER)]
+    scenarios = [('prior split-based parser', split_pagination),
+                 ('github_pagination()', github_pagination)]
+    for description, parser in scenarios:
+        def run(parser=parser):
+            for header in headers:
+                pagelinks = parser(header)
+                _ = (pagelinks['nextURL'], pagelinks['lastpage'])
+        seconds = min(timeit.repeat(run, number=1, repeat=5))
+        print('{0:>7.2f} us  {1}'.format(seconds / NUMBER * 1000000, description))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,116 @@
+"""Tests for dougerino. Run from the repo root: python -m pytest tests
+"""
+import csv
+import os
+import random
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from dougerino import csv_join, csv2list, csv2sorted  # pylint: disable=C0413
+
+@pytest.fixture(name='logins_csv')
+def fixture_logins_csv(tmp_path):
+    """CSV file with a header row and many duplicate, mixed-case logins."""
+    randomizer = random.Random(1)
+    filename = str(tmp_path / 'logins.csv')
+    with open(filename, 'w') as fhandle:
+        fhandle.write('org,login\n')
+        for _ in range(5000):
+            fhandle.write('org,User{0}\n'.format(randomizer.randint(0, 1000)))
+    return filename
+
+@pytest.mark.parametrize('dedupe', [True, False])
+@pytest.mark.parametrize('max_memory, max_open', [
+    (1024 * 1024 * 1024, None), # fits in memory
+    (2000, None),               # a single merge pass
+    (500, 2),                   # many merge passes
+    (500, 5)])
+def test_csv2sorted_matches_csv2list(logins_csv, dedupe, max_memory, max_open):
+    """csv2sorted() returns the same values as csv2list(), however many runs
+    and merge passes are needed."""
+    expected = csv2list(logins_csv, 1, dedupe=dedupe)
+    assert list(csv2sorted(logins_csv, 1, dedupe=dedupe, max_memory=max_memory,
+                           max_open=max_open)) == expected
+
+@pytest.fixture(name='join_files')
+def fixture_join_files(tmp_path):
+    """Left and right CSV files that both have a name column, with a short
+    row and blank lines in the right file."""
+    leftfile = str(tmp_path / 'left.csv')
+    rightfile = str(tmp_path / 'right.csv')
+    with open(leftfile, 'w') as fhandle:
+        fhandle.write('login,name\nAlice,Alice L\nbob,Bob B\ncarol,Carol C\n')
+    with open(rightfile, 'w') as fhandle:
+        fhandle.write('login,name,email\n\nalice,Alice R,a@x\nBOB,Bob R\n\n')
+    return leftfile, rightfile
+
+def read_csv(filename):
+    """Return the rows of a CSV file as a list of lists."""
+    with open(filename, newline='') as fhandle:
+        return list(csv.reader(fhandle))
+
+@pytest.mark.parametrize('max_memory', [1024 * 1024, 50]) # 50 = partitioned
+def test_csv_join_default_columns(tmp_path, join_files, max_memory):
+    """Default columns are written from their own file, even if both files
+    have a column with the same name."""
+    outfile = str(tmp_path / 'out.csv')
+    assert csv_join(*join_files, outfile, 'login', how='left',
+                    max_memory=max_memory) == 3
+    rows = read_csv(outfile)
+    assert rows[0] == ['login', 'name', 'name', 'email']
+    assert sorted(rows[1:]) == [['Alice', 'Alice L', 'Alice R', 'a@x'],
+                                ['bob', 'Bob B', 'Bob R', ''],
+                                ['carol', 'Carol C', '', '']]
+
+def test_csv_join_qualified_columns(tmp_path, join_files):
+    """Columns can be qualified with left. or right."""
+    outfile = str(tmp_path / 'out.csv')
+    assert csv_join(*join_files, outfile, 'login',
+                    columns=['login', 'right.name', 'left.name']) == 2
+    assert sorted(read_csv(outfile)[1:]) == [['Alice', 'Alice R', 'Alice L'],
+                                             ['bob', 'Bob R', 'Bob B']]
+
+@pytest.mark.parametrize('how, expected', [('inner', 0), ('left', 2)])
+@pytest.mark.parametrize('swap', [False, True]) # build from left or right
+def test_csv_join_blank_keys(tmp_path, how, expected, swap):
+    """Blank keys don't match each other; left rows with a blank key are
+    written once for a left join."""
+    leftfile = str(tmp_path / 'left.csv')
+    rightfile = str(tmp_path / 'right.csv')
+    left = 'login,name\n,Blank 1\n ,Blank 2\n'
+    right = 'login,email\n,b1@x\n,b2@x\n,b3@x\n'
+    if swap:
+        left += 'padding,' + 'x' * 100 + '\n' # make left the larger file
+    with open(leftfile, 'w') as fhandle:
+        fhandle.write(left)
+    with open(rightfile, 'w') as fhandle:
+        fhandle.write(right)
+    outfile = str(tmp_path / 'out.csv')
+    if swap and how == 'left':
+        expected += 1 # the padding row
+    assert csv_join(leftfile, rightfile, outfile, 'login', how=how) == expected
+    assert all(row[2] == '' for row in read_csv(outfile)[1:])
+
+@pytest.mark.parametrize('how', ['inner', 'left'])
+def test_csv_join_multiple_passes(tmp_path, how):
+    """With a small max_open, partitions are split again in further passes,
+    and the result is the same as an in-memory join."""
+    leftfile = str(tmp_path / 'left.csv')
+    rightfile = str(tmp_path / 'right.csv')
+    with open(leftfile, 'w') as fhandle:
+        fhandle.write('login,name\n')
+        for userno in range(500):
+            fhandle.write('user{0},Name {0}\n'.format(userno))
+    with open(rightfile, 'w') as fhandle:
+        fhandle.write('login,email\n')
+        for userno in range(0, 1000, 3):
+            fhandle.write('USER{0},user{0}@x\n'.format(userno))
+    expected_file = str(tmp_path / 'expected.csv')
+    outfile = str(tmp_path / 'out.csv')
+    expected = csv_join(leftfile, rightfile, expected_file, 'login', how=how)
+    assert csv_join(leftfile, rightfile, outfile, 'login', how=how,
+                    max_memory=200, max_open=4) == expected
+    assert sorted(read_csv(outfile)) == sorted(read_csv(expected_file))
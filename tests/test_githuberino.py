@@ -0,0 +1,201 @@
+"""Tests for githuberino. github_pagination() is tested with real GitHub link
+header shapes, and the GraphQL functions against a local stub endpoint.
+Run from the repo root: python -m pytest tests
+"""
+import http.server
+import itertools
+import json
+import os
+import sys
+import threading
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from githuberino import (github_graphql_allpages, github_graphql_batch,  # pylint: disable=C0413
+                         github_pagination)
+
+REPO_ISSUES = 'https://api.github.com/repositories/1300192/issues'
+
+class StubResponse: # pylint: disable=R0903
+    """Minimal stand-in for a requests response object.
+    """
+    def __init__(self, headers):
+        self.headers = headers
+
+def link_header(links):
+    """Build a link header from a list of (url, rel) tuples, as GitHub does.
+    """
+    return ', '.join('<{0}>; rel="{1}"'.format(url, rel) for url, rel in links)
+
+def test_issues_header():
+    """Typical header for a page in the middle of a repo's issues."""
+    header = link_header([(REPO_ISSUES + '?page=2', 'prev'),
+                          (REPO_ISSUES + '?page=4', 'next'),
+                          (REPO_ISSUES + '?page=515', 'last'),
+                          (REPO_ISSUES + '?page=1', 'first')])
+    pagelinks = github_pagination(header)
+    assert pagelinks.nextURL == REPO_ISSUES + '?page=4'
+    assert (pagelinks.firstpage, pagelinks.prevpage, pagelinks.nextpage,
+            pagelinks.lastpage) == (1, 2, 4, 515)
+
+@pytest.mark.parametrize('params', list(itertools.permutations(
+    ['page=7', 'per_page=100', 'state=all', 'sort=updated'])))
+def test_page_in_any_position(params):
+    """The page # is found wherever page appears in the query string."""
+    url = REPO_ISSUES + '?' + '&'.join(params)
+    pagelinks = github_pagination(link_header([(url, 'next'), (url, 'last')]))
+    assert pagelinks.nextpage == 7
+    assert pagelinks.lastpage == 7
+    assert pagelinks.nextURL == url
+    assert pagelinks.params['next'] == {'page': 7, 'per_page': 100,
+                                        'state': 'all', 'sort': 'updated'}
+
+@pytest.mark.parametrize('pageno', [1, 2, 9, 10, 99, 100, 12345])
+def test_page_numbers(pageno):
+    """Page #s are returned as ints, and per_page isn't mistaken for page."""
+    url = REPO_ISSUES + '?page={0}&per_page=30'.format(pageno)
+    pagelinks = github_pagination(link_header([(url, 'next')]))
+    assert pagelinks.nextpage == pageno
+    assert pagelinks.params['next']['per_page'] == 30
+
+def test_per_page_only():
+    """A per_page parameter without a page parameter is page 0."""
+    url = REPO_ISSUES + '?per_page=100'
+    pagelinks = github_pagination(link_header([(url, 'next')]))
+    assert pagelinks.nextpage == 0
+    assert pagelinks.params['next'] == {'per_page': 100}
+
+def test_cursor_parameters():
+    """Cursor-based links (e.g., audit log) have no page #."""
+    url = ('https://api.github.com/orgs/example/audit-log?per_page=100'
+           '&after=MS42NjQzODMzNjc4NjdlKzEyfDE2MDcyNjM5MDk3NDE%3D&before=')
+    pagelinks = github_pagination(link_header([(url, 'next')]))
+    assert pagelinks.nextURL == url
+    assert pagelinks.nextpage == 0
+    assert pagelinks.params['next'] == {
+        'per_page': 100, 'after': 'MS42NjQzODMzNjc4NjdlKzEyfDE2MDcyNjM5MDk3NDE=',
+        'before': ''}
+
+@pytest.mark.parametrize('link_header_arg', [
+    '', StubResponse({}), StubResponse({'Content-Type': 'application/json'})])
+def test_missing_header(link_header_arg):
+    """No link header (a single page of results) returns empty links."""
+    pagelinks = github_pagination(link_header_arg)
+    assert pagelinks.nextURL is None
+    assert pagelinks.lastpage == 0
+    assert pagelinks.urls == {}
+
+def test_response_object():
+    """The link header is read from a response object."""
+    url = REPO_ISSUES + '?page=2'
+    pagelinks = github_pagination(StubResponse({'Link': link_header([(url, 'next')])}))
+    assert pagelinks.nextURL == url
+
+def test_unknown_rel():
+    """Unknown link types are available in urls, but don't affect the
+    first/prev/next/last values."""
+    header = link_header([(REPO_ISSUES + '?page=3', 'self'),
+                          (REPO_ISSUES + '?page=4', 'next')])
+    pagelinks = github_pagination(header)
+    assert pagelinks.urls['self'] == REPO_ISSUES + '?page=3'
+    assert pagelinks.nextpage == 4
+    assert pagelinks.firstURL is None
+    assert 'self' not in pagelinks
+
+@pytest.mark.parametrize('value', ['²', '٣', 'abc', '', '2x'])
+def test_non_ascii_page(value):
+    """Page values that aren't ASCII digits are page 0, not an exception."""
+    url = REPO_ISSUES + '?page=' + value
+    pagelinks = github_pagination(link_header([(url, 'next')]))
+    assert pagelinks.nextpage == 0
+    assert not isinstance(pagelinks.params['next']['page'], int)
+
+def test_dictionary_access():
+    """PageLinks supports the dictionary-style access of prior versions."""
+    url = REPO_ISSUES + '?page=2'
+    pagelinks = github_pagination(link_header([(url, 'next')]))
+    assert pagelinks['nextURL'] == url
+    assert 'nextURL' in pagelinks
+    assert 'nonsense' not in pagelinks
+    assert pagelinks.get('nonsense', 'default') == 'default'
+    assert dict(pagelinks) == {'firstpage': 0, 'firstURL': None,
+                               'prevpage': 0, 'prevURL': None,
+                               'nextpage': 2, 'nextURL': url,
+                               'lastpage': 0, 'lastURL': None}
+    with pytest.raises(KeyError):
+        _ = pagelinks['params']
+
+class GraphQLStubHandler(http.server.BaseHTTPRequestHandler):
+    """Stub GraphQL endpoint. Aliased lookup queries with more than two
+    aliases are rejected with MAX_NODE_LIMIT_EXCEEDED, and queries that use
+    a $cursor variable return three pages of an organization's repos.
+    """
+    queries = []
+
+    def do_POST(self): # pylint: disable=C0103
+        """Handle a GraphQL query."""
+        body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        query = body['query']
+        self.queries.append(body)
+        if '$cursor' in query:
+            pageno = int(body['variables']['cursor'] or 0)
+            jsondata = {'data': {'organization': {'repositories': {
+                'nodes': [{'name': 'repo' + str(pageno)}],
+                'pageInfo': {'hasNextPage': pageno < 2,
+                             'endCursor': str(pageno + 1)}}}}}
+        else:
+            aliases = [line.split(':')[0] for line in query.split('\n')[1:-1]]
+            if len(aliases) > 2:
+                jsondata = {'errors': [{'type': 'MAX_NODE_LIMIT_EXCEEDED'}]}
+            else:
+                jsondata = {'data': {alias: {'name': alias} for alias in aliases}}
+        self.send_response(200)
+        self.end_headers()
+        self.wfile.write(json.dumps(jsondata).encode('utf-8'))
+
+    def log_message(self, *args): # pylint: disable=W0221
+        """Don't log requests to the console."""
+
+@pytest.fixture(name='graphql_endpoint')
+def fixture_graphql_endpoint():
+    """URL of a stub GraphQL endpoint running on a local port."""
+    GraphQLStubHandler.queries = []
+    server = http.server.HTTPServer(('127.0.0.1', 0), GraphQLStubHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield 'http://127.0.0.1:{0}/graphql'.format(server.server_port)
+    server.shutdown()
+    server.server_close()
+
+def test_graphql_batch_split(graphql_endpoint):
+    """Batches rejected for the node limit are split until they succeed, and
+    results are returned in the order of the fragments."""
+    fragments = ['repository(owner:"a", name:"r{0}") {{name}}'.format(repono)
+                 for repono in range(5)]
+    results = github_graphql_batch(fragments, auth=('user', 'pat'),
+                                   endpoint=graphql_endpoint)
+    assert results == [{'name': 'q' + str(fragno)} for fragno in range(5)]
+    assert len(GraphQLStubHandler.queries) == 5 # 1 rejected, 1 rejected, 3 ok
+
+def test_graphql_batch_max_aliases(graphql_endpoint):
+    """Batches are split up front by max_aliases."""
+    results = github_graphql_batch({'a': 'x {name}', 'b': 'y {name}',
+                                    'c': 'z {name}'}, max_aliases=2,
+                                   auth=('user', 'pat'), endpoint=graphql_endpoint)
+    assert results == {'a': {'name': 'a'}, 'b': {'name': 'b'}, 'c': {'name': 'c'}}
+    assert len(GraphQLStubHandler.queries) == 2
+
+def test_graphql_allpages(graphql_endpoint):
+    """All pages are retrieved by following endCursor."""
+    query = 'query($cursor: String) {organization {repositories}}'
+    repos = github_graphql_allpages(query=query, path='organization.repositories',
+                                    auth=('user', 'pat'), endpoint=graphql_endpoint)
+    assert repos == [{'name': 'repo0'}, {'name': 'repo1'}, {'name': 'repo2'}]
+    assert [body['variables']['cursor'] for body in GraphQLStubHandler.queries] \
+        == [None, '1', '2']
+
+def test_graphql_allpages_no_path():
+    """A missing path is reported, not an exception."""
+    assert github_graphql_allpages(query='query {x}') is None